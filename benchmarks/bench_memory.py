@@ -0,0 +1,102 @@
+"""
+Memory held by paragraphs, sentences and index chunks: offset records over the
+document buffer vs. the previous frozen dataclasses, which each held a text string
+(a chunk shared its paragraph's string, sentences had their own).
+
+    python -m benchmarks.bench_memory docx --copies 20
+
+The document texts themselves are loaded before measuring, so only the
+segmentation structures are counted.
+"""
+import argparse
+import gc
+import tracemalloc
+from dataclasses import dataclass, replace
+
+import spacy
+
+from utils.document_io import load_folder
+from nlp.segmentation import segment_text
+from retrieval.semantic_search import IndexedChunk
+
+
+# the records as they were before the offset representation
+@dataclass(frozen=True)
+class OldParagraph:
+    paragraph_id: int
+    text: str
+
+
+@dataclass(frozen=True)
+class OldSentence:
+    paragraph_id: int
+    sentence_id: int
+    text: str
+
+
+@dataclass(frozen=True)
+class OldIndexedChunk:
+    doc_id: str
+    paragraph_id: int
+    text: str
+
+
+def build_offsets(docs, nlp):
+    out = []
+    for d in docs:
+        paras, sents = segment_text(d.text, nlp)
+        chunks = [IndexedChunk(d.doc_id, p.paragraph_id, p.source, p.start, p.end) for p in paras]
+        out.append((paras, sents, chunks))
+    return out
+
+
+def build_old(docs, structs):
+    # what the old segment_paragraphs / segment_sentences / build_from_docs kept
+    out = []
+    for d, (paras, sents, _) in zip(docs, structs):
+        old_paras = [OldParagraph(p.paragraph_id, p.text) for p in paras]
+        out.append((
+            old_paras,
+            [OldSentence(s.paragraph_id, s.sentence_id, s.text) for s in sents],
+            [OldIndexedChunk(d.doc_id, p.paragraph_id, p.text) for p in old_paras],
+        ))
+    return out
+
+
+def measure(fn, *args):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = fn(*args)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("folder")
+    ap.add_argument("--copies", type=int, default=20)
+    args = ap.parse_args()
+
+    nlp = spacy.blank("en")
+    nlp.add_pipe("sentencizer")
+
+    base = load_folder(args.folder)
+    # distinct buffers per copy, like distinct documents would have
+    docs = [replace(d, doc_id=f"{d.doc_id}#{c}", text=d.text + f"\n#{c}") for c in range(args.copies) for d in base]
+    text_bytes = sum(len(d.text.encode("utf-8")) for d in docs)
+
+    structs = build_offsets(docs, nlp)
+    _, offset_mem = measure(build_offsets, docs, nlp)
+    _, old_mem = measure(build_old, docs, structs)
+
+    print(f"{len(docs)} docs, {text_bytes / 1e6:.1f} MB of text")
+    print(f"offset records : {offset_mem / 1e6:8.2f} MB")
+    print(f"old dataclasses: {old_mem / 1e6:8.2f} MB")
+    print(f"reduction      : {1 - offset_mem / old_mem:8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Build-time scaling of ShardedCorpusIndex with the number of worker processes.
+
+    python -m benchmarks.bench_sharded_build pdf --shards 4 --copies 8
+
+Every document in the folder is replicated `--copies` times (with distinct doc_ids)
+so each shard has enough work for the timing to be meaningful.
+"""
+import argparse
+import os
+import tempfile
+import time
+from dataclasses import replace
+
+from utils.document_io import load_folder
+from retrieval.sharded_index import ShardedCorpusIndex
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("folder")
+    ap.add_argument("--shards", type=int, default=4)
+    ap.add_argument("--copies", type=int, default=8)
+    args = ap.parse_args()
+
+    base = load_folder(args.folder)
+    docs = [replace(d, doc_id=f"{d.doc_id}#{c}") for c in range(args.copies) for d in base]
+    print(f"{len(docs)} docs, {args.shards} shards, {os.cpu_count()} cpus")
+
+    baseline = None
+    workers = 1
+    while workers <= args.shards:
+        with tempfile.TemporaryDirectory() as tmp:
+            with ShardedCorpusIndex(tmp, num_shards=args.shards, workers=workers) as index:
+                # start the workers before timing so process spawn isn't counted
+                index.start_workers()
+
+                t0 = time.perf_counter()
+                index.build_from_docs(docs)
+                elapsed = time.perf_counter() - t0
+
+        baseline = baseline or elapsed
+        print(f"workers={workers:2d}  build={elapsed:7.2f}s  speedup={baseline / elapsed:5.2f}x")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
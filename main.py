@@ -199,13 +199,20 @@ def menu():
                 index.build_from_docs(docs, min_par_len=50)
                 index.save(cache_path)
                 print(f"Saved index to {cache_path}")
+                if index.dedup_stats:
+                    print(
+                        f"Deduplicated {index.dedup_stats['paragraphs']} paragraphs into "
+                        f"{index.dedup_stats['unique']} ({index.dedup_stats['encodes_saved']} encodes saved)"
+                    )
 
             results = index.search(query, top_k=top_k)
 
             print("\nResults: ")
             for score, chunk in results:
                 snippet = chunk.text if len(chunk.text) < 300 else chunk.text[:300] + "..."
-                print(f"- score={score:.3f} | DOC={chunk.doc_id} | P{chunk.paragraph_id}")
+                n_locs = len(chunk.all_locations)
+                dups = f" | +{n_locs - 1} duplicates" if n_locs > 1 else ""
+                print(f"- score={score:.3f} | DOC={chunk.doc_id} | P{chunk.paragraph_id}{dups}")
                 print(f"  {snippet}\n")
 
             # Save semantic search results (JSON-friendly)
@@ -216,6 +223,7 @@ def menu():
                 "cache_key": cache_key,
                 "index_cache_path": cache_path,
                 "index_loaded_from_cache": used_cache,
+                "dedup_stats": index.dedup_stats,
                 "query": query,
                 "top_k": top_k,
                 "results": [
@@ -224,6 +232,7 @@ def menu():
                         "doc_id": chunk.doc_id,
                         "paragraph_id": chunk.paragraph_id,
                         "text": chunk.text,
+                        "locations": [list(loc) for loc in chunk.all_locations],
                     }
                     for score, chunk in results
                 ],
@@ -0,0 +1,168 @@
+from __future__ import annotations
+import hashlib
+import re
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from nlp.segmentation import Paragraph
+
+# a prime just above 2**32, for the (a * x + b) % p universal hashes
+_PRIME = 4294967311
+
+_WS = re.compile(r"\s+")
+
+
+@dataclass
+class DedupGroup:
+    locations: List[Tuple[str, int]]   # every (doc_id, paragraph_id) carrying this text
+    members: List[Paragraph]           # the paragraph at each location, aligned with locations
+
+    @property
+    def paragraph(self) -> Paragraph:
+        # representative: the first occurrence
+        return self.members[0]
+
+    @property
+    def text(self) -> str:
+        return self.paragraph.text
+
+
+@dataclass
+class DedupResult:
+    groups: List[DedupGroup]
+    total: int = 0            # paragraphs seen
+    exact_dups: int = 0
+    near_dups: int = 0
+
+    @property
+    def unique(self) -> int:
+        return len(self.groups)
+
+    @property
+    def encodes_saved(self) -> int:
+        return self.total - self.unique
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "paragraphs": self.total,
+            "unique": self.unique,
+            "exact_dups": self.exact_dups,
+            "near_dups": self.near_dups,
+            "encodes_saved": self.encodes_saved,
+        }
+
+
+def normalize_for_hash(text: str) -> str:
+    """
+    Lowercases and collapses whitespace so trivial formatting differences hash the same.
+    """
+    return _WS.sub(" ", text).strip().lower()
+
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles, with LSH banding to find candidate pairs.
+    num_perm must be divisible by bands; the default 16 bands x 8 rows puts the
+    LSH threshold around Jaccard 0.7.
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 16, shingle_size: int = 3, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.RandomState(seed)
+        # a < 2**31 and x < 2**32 keep a * x + b inside uint64
+        self.a = rng.randint(1, 2**31, size=(num_perm, 1)).astype(np.uint64)
+        self.b = rng.randint(0, 2**31, size=(num_perm, 1)).astype(np.uint64)
+
+    def shingles(self, norm_text: str) -> np.ndarray:
+        words = norm_text.split(" ")
+        k = self.shingle_size
+        if len(words) <= k:
+            grams = {norm_text}
+        else:
+            grams = {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+        return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64)
+
+    def signature(self, norm_text: str) -> np.ndarray:
+        x = self.shingles(norm_text)
+        return ((self.a * x + self.b) % _PRIME).min(axis=1)
+
+    def band_keys(self, sig: np.ndarray) -> List[bytes]:
+        r = self.rows
+        return [bytes([i]) + sig[i * r:(i + 1) * r].tobytes() for i in range(self.bands)]
+
+
+def deduplicate_paragraphs(
+    items: Iterable[Tuple[str, Paragraph]],
+    near_dup_threshold: Optional[float] = 0.8,
+    hasher: Optional[MinHasher] = None,
+) -> DedupResult:
+    """
+    items: (doc_id, Paragraph) pairs, in corpus order.
+
+    Exact duplicates (after normalize_for_hash) are caught with a sha1 lookup.
+    The rest go through MinHash/LSH: a paragraph joins an existing group when the
+    estimated Jaccard similarity with the group's representative is >= near_dup_threshold.
+    Pass near_dup_threshold=None to only drop exact duplicates.
+    """
+    if near_dup_threshold is not None and hasher is None:
+        hasher = MinHasher()
+
+    result = DedupResult(groups=[])
+    by_hash: Dict[str, int] = {}             # sha1 -> group index
+    buckets: Dict[bytes, List[int]] = {}     # LSH band key -> group indexes
+    signatures: List[np.ndarray] = []
+
+    for doc_id, p in items:
+        result.total += 1
+        norm = normalize_for_hash(p.text)
+        key = hashlib.sha1(norm.encode("utf-8")).hexdigest()
+
+        g = by_hash.get(key)
+        if g is not None:
+            result.groups[g].locations.append((doc_id, p.paragraph_id))
+            result.groups[g].members.append(p)
+            result.exact_dups += 1
+            continue
+
+        if near_dup_threshold is not None:
+            sig = hasher.signature(norm)
+            band_keys = hasher.band_keys(sig)
+
+            best, best_sim = None, near_dup_threshold
+            seen = set()
+            for bk in band_keys:
+                for cand in buckets.get(bk, ()):
+                    if cand in seen:
+                        continue
+                    seen.add(cand)
+                    sim = float(np.mean(signatures[cand] == sig))
+                    if sim >= best_sim:
+                        best, best_sim = cand, sim
+
+            if best is not None:
+                result.groups[best].locations.append((doc_id, p.paragraph_id))
+                result.groups[best].members.append(p)
+                by_hash[key] = best
+                result.near_dups += 1
+                continue
+
+        g = len(result.groups)
+        result.groups.append(DedupGroup(locations=[(doc_id, p.paragraph_id)], members=[p]))
+        by_hash[key] = g
+
+        if near_dup_threshold is not None:
+            signatures.append(sig)
+            for bk in band_keys:
+                buckets.setdefault(bk, []).append(g)
+
+    return result
@@ -1,22 +1,143 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import List, Optional
+from dataclasses import FrozenInstanceError
+from typing import List, Optional, Tuple
 
-@dataclass(frozen=True)
-class Paragraph:
-    paragraph_id: int
-    text: str
 
-@dataclass(frozen=True)
-class Sentence:
-    paragraph_id: int
-    sentence_id: int   # sentence index WITHIN the paragraph
-    text: str
+class TextSpan:
+    """
+    A (start, end) slice of a shared text buffer (usually LoadedDoc.text).
+
+    Only the offsets and a reference to the buffer are stored; `.text` is sliced on
+    access, so paragraphs, sentences and chunks don't each keep their own copy.
+    Pass `text=` instead of source/start/end for a span that owns its text.
+    Immutable, like the frozen dataclasses these records replaced.
+    """
+    __slots__ = ("source", "start", "end")
+
+    def __init__(
+        self,
+        source: Optional[str] = None,
+        start: int = 0,
+        end: Optional[int] = None,
+        text: Optional[str] = None,
+    ):
+        if text is not None:
+            if source is not None:
+                raise TypeError("pass either text or source, not both")
+            source, start, end = text, 0, None
+        elif source is None:
+            raise TypeError("missing source (or text)")
+
+        self._set(source=source, start=start, end=len(source) if end is None else end)
+
+    def _set(self, **fields) -> None:
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise FrozenInstanceError(f"cannot assign to field {name!r}")
+
+    def __delattr__(self, name):
+        raise FrozenInstanceError(f"cannot delete field {name!r}")
+
+    def __reduce__(self):
+        return (TextSpan, self.span())
+
+    @property
+    def text(self) -> str:
+        return self.source[self.start:self.end]
+
+    def span(self) -> Tuple[str, int, int]:
+        return self.source, self.start, self.end
+
+
+class Paragraph(TextSpan):
+    __slots__ = ("paragraph_id",)
+
+    def __init__(
+        self,
+        paragraph_id: int,
+        source: Optional[str] = None,
+        start: int = 0,
+        end: Optional[int] = None,
+        text: Optional[str] = None,
+    ):
+        super().__init__(source, start, end, text)
+        self._set(paragraph_id=paragraph_id)
+
+    def __reduce__(self):
+        return (Paragraph, (self.paragraph_id, *self.span()))
+
+    def _key(self) -> Tuple:
+        return (self.paragraph_id, self.text)
+
+    def __eq__(self, other):
+        return isinstance(other, Paragraph) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return f"Paragraph(paragraph_id={self.paragraph_id!r}, text={self.text!r})"
+
+
+class Sentence(TextSpan):
+    __slots__ = ("paragraph_id", "sentence_id")
+
+    def __init__(
+        self,
+        paragraph_id: int,
+        sentence_id: int,   # sentence index WITHIN the paragraph
+        source: Optional[str] = None,
+        start: int = 0,
+        end: Optional[int] = None,
+        text: Optional[str] = None,
+    ):
+        super().__init__(source, start, end, text)
+        self._set(paragraph_id=paragraph_id, sentence_id=sentence_id)
+
+    def __reduce__(self):
+        return (Sentence, (self.paragraph_id, self.sentence_id, *self.span()))
+
+    def _key(self) -> Tuple:
+        return (self.paragraph_id, self.sentence_id, self.text)
+
+    def __eq__(self, other):
+        return isinstance(other, Sentence) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return (
+            f"Sentence(paragraph_id={self.paragraph_id!r}, "
+            f"sentence_id={self.sentence_id!r}, text={self.text!r})"
+        )
+
+
+def _strip_span(text: str, start: int, end: int) -> Tuple[int, int]:
+    # offset equivalent of text[start:end].strip()
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
 
 def segment_paragraphs(text: str, min_len: int = 1) -> List[Paragraph]:
-    raw_paras = (p.strip() for p in text.split("\n"))
-    paras = [p for p in raw_paras if len(p) >= min_len]
-    return [Paragraph(i, p) for i, p in enumerate(paras)]
+    # offset equivalent of [l.strip() for l in text.split("\n")], filtered by min_len
+    spans = []
+    pos = 0
+    while True:
+        nl = text.find("\n", pos)
+        line_end = len(text) if nl == -1 else nl
+        start, end = _strip_span(text, pos, line_end)
+        if end - start >= min_len:
+            spans.append((start, end))
+        if nl == -1:
+            break
+        pos = nl + 1
+    return [Paragraph(i, text, s, e) for i, (s, e) in enumerate(spans)]
 
 def segment_sentences(
     text: str,
@@ -39,14 +160,17 @@ def segment_sentences(
         doc = nlp(p.text)
         sent_id = 0
         for sent in doc.sents:
-            s = sent.text.strip()
-            if len(s) < min_len:
+            # spaCy offsets are relative to the paragraph; shift them into p.source
+            start, end = _strip_span(p.source, p.start + sent.start_char, p.start + sent.end_char)
+            if end - start < min_len:
                 continue
             sentences.append(
                 Sentence(
                     paragraph_id=p.paragraph_id,
                     sentence_id=sent_id,
-                    text=s,
+                    source=p.source,
+                    start=start,
+                    end=end,
                 )
             )
             sent_id += 1
@@ -1,5 +1,4 @@
-from dataclasses import dataclass
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 import os
 import pickle
 import numpy as np
@@ -7,39 +6,196 @@ import numpy as np
 from sentence_transformers import SentenceTransformer
 from sklearn.neighbors import NearestNeighbors
 
-from nlp.segmentation import segment_paragraphs
+from nlp.segmentation import TextSpan, segment_paragraphs
+from nlp.deduplication import deduplicate_paragraphs
 
 
-@dataclass(frozen=True)
-class IndexedChunk:
-    doc_id: str
-    paragraph_id: int
-    text: str
+class EmptyCorpusError(ValueError):
+    """
+    Raised by build_from_docs() when the docs contain no paragraph of at least min_par_len.
+    """
+
+
+class IndexedChunk(TextSpan):
+    """
+    An indexed paragraph, stored as offsets into its document's text.
+    `locations` lists every (doc_id, paragraph_id) whose paragraph was deduplicated into it.
+    `variants` is aligned with `locations`: None where that paragraph's text is exactly
+    the chunk's text, otherwise a span with the paragraph's own text (near-duplicates).
+    """
+    __slots__ = ("doc_id", "paragraph_id", "locations", "variants")
+
+    def __init__(
+        self,
+        doc_id: str,
+        paragraph_id: int,
+        source: Optional[str] = None,
+        start: int = 0,
+        end: Optional[int] = None,
+        locations: Tuple[Tuple[str, int], ...] = (),
+        variants: Tuple[Optional[TextSpan], ...] = (),
+        text: Optional[str] = None,
+    ):
+        super().__init__(source, start, end, text)
+        self._set(doc_id=doc_id, paragraph_id=paragraph_id, locations=locations, variants=variants)
+
+    @property
+    def all_locations(self) -> Tuple[Tuple[str, int], ...]:
+        """
+        Every (doc_id, paragraph_id) of this chunk; just its own for indexes built
+        with dedup=False or pickled before deduplication existed.
+        """
+        return self.locations or ((self.doc_id, self.paragraph_id),)
+
+    def _variants(self) -> Tuple[Optional[TextSpan], ...]:
+        return self.variants or (None,) * len(self.all_locations)
+
+    def expand(self) -> List["IndexedChunk"]:
+        """
+        One plain chunk per source location, each with that paragraph's own text.
+        """
+        return [
+            IndexedChunk(doc_id, pid, *(self if v is None else v).span())
+            for (doc_id, pid), v in zip(self.all_locations, self._variants())
+        ]
+
+    def merge(self, others: List["IndexedChunk"]) -> "IndexedChunk":
+        """
+        This chunk as representative, with the locations of `others` appended.
+        """
+        locs = list(self.all_locations)
+        variants = list(self._variants())
+        for o in others:
+            own = None if o.text == self.text else TextSpan(*o.span())
+            for loc, v in zip(o.all_locations, o._variants()):
+                locs.append(loc)
+                variants.append(own if v is None else v)
+        return IndexedChunk(
+            self.doc_id, self.paragraph_id, self.source, self.start, self.end,
+            tuple(locs), tuple(variants),
+        )
+
+    def detach(self) -> "IndexedChunk":
+        """
+        Copy that owns only its own text, for sending across processes without the
+        whole document buffer.
+        """
+        return IndexedChunk(
+            self.doc_id, self.paragraph_id, self.text,
+            locations=self.locations,
+            variants=tuple(None if v is None else TextSpan(v.text) for v in self.variants),
+        )
+
+    def _key(self) -> Tuple:
+        variant_texts = tuple(None if v is None else v.text for v in self.variants)
+        return (self.doc_id, self.paragraph_id, self.text, self.locations, variant_texts)
+
+    def __eq__(self, other):
+        return isinstance(other, IndexedChunk) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return (
+            f"IndexedChunk(doc_id={self.doc_id!r}, paragraph_id={self.paragraph_id!r}, "
+            f"text={self.text!r}, locations={self.locations!r})"
+        )
+
+    def __reduce__(self):
+        # only the chunk's own text, not the whole document buffer
+        d = self.detach()
+        return (
+            IndexedChunk,
+            (d.doc_id, d.paragraph_id, *d.span(), d.locations, d.variants),
+        )
+
+    def __setstate__(self, state):
+        # indexes pickled when IndexedChunk was a dataclass holding its own text
+        _, slots = state if isinstance(state, tuple) else (None, state)
+        text = slots["text"]
+        self._set(
+            source=text,
+            start=0,
+            end=len(text),
+            doc_id=slots["doc_id"],
+            paragraph_id=slots["paragraph_id"],
+            locations=slots.get("locations", ()),
+            variants=(),
+        )
 
 
 class SemanticCorpusIndex:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
-        self.model = SentenceTransformer(model_name)
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        model: Optional[SentenceTransformer] = None,
+    ):
+        # `model` lets several indexes in one process share an already loaded encoder
+        self.model_name = model_name
+        self._model: Optional[SentenceTransformer] = model
         self.nn: Optional[NearestNeighbors] = None
         self.embeddings: Optional[np.ndarray] = None
         self.chunks: List[IndexedChunk] = []
+        self.dedup_stats: Dict[str, int] = {}
+
+    @property
+    def model(self) -> SentenceTransformer:
+        # loaded lazily: shard workers that only search by embedding never need it
+        if self._model is None:
+            self._model = SentenceTransformer(self.model_name)
+        return self._model
 
-    def build_from_docs(self, docs, min_par_len: int = 50) -> None:
+    def build_from_docs(
+        self,
+        docs,
+        min_par_len: int = 50,
+        dedup: bool = True,
+        near_dup_threshold: Optional[float] = 0.8,
+    ) -> None:
         """
         docs: List[LoadedDoc]
         Creates paragraph chunks across all docs and embeds them.
+
+        With dedup=True, exact and near-duplicate paragraphs (boilerplate, repeated
+        footers...) are embedded once; the chunk keeps all their locations and
+        dedup_stats records how many encodes were saved.
         """
-        chunks: List[IndexedChunk] = []
-        texts: List[str] = []
+        items = [
+            (d.doc_id, p)
+            for d in docs
+            for p in segment_paragraphs(d.text, min_len=min_par_len)
+        ]
+
+        if not items:
+            raise EmptyCorpusError("No paragraphs found to index (try lowering min_par_len).")
 
-        for d in docs:
-            paras = segment_paragraphs(d.text, min_len=min_par_len)
-            for p in paras:
-                chunks.append(IndexedChunk(doc_id=d.doc_id, paragraph_id=p.paragraph_id, text=p.text))
-                texts.append(p.text)
+        if dedup:
+            result = deduplicate_paragraphs(items, near_dup_threshold=near_dup_threshold)
+            chunks = [
+                IndexedChunk(
+                    doc_id=g.locations[0][0],
+                    paragraph_id=g.locations[0][1],
+                    source=g.paragraph.source,
+                    start=g.paragraph.start,
+                    end=g.paragraph.end,
+                    locations=tuple(g.locations),
+                    variants=tuple(
+                        None if m.text == g.text else TextSpan(m.source, m.start, m.end)
+                        for m in g.members
+                    ),
+                )
+                for g in result.groups
+            ]
+            self.dedup_stats = result.stats()
+        else:
+            chunks = [
+                IndexedChunk(doc_id, p.paragraph_id, p.source, p.start, p.end)
+                for doc_id, p in items
+            ]
+            self.dedup_stats = {}
 
-        if not texts:
-            raise ValueError("No paragraphs found to index (try lowering min_par_len).")
+        texts = [c.text for c in chunks]
 
         emb = self.model.encode(texts, normalize_embeddings=True, show_progress_bar=True)
         emb = np.asarray(emb, dtype=np.float32)
@@ -51,11 +207,32 @@ class SemanticCorpusIndex:
         self.nn = NearestNeighbors(metric="cosine", algorithm="auto")
         self.nn.fit(self.embeddings)
 
-    def search(self, query: str, top_k: int = 5) -> List[Tuple[float, IndexedChunk]]:
+    def search(
+        self, query: str, top_k: int = 5, collapse_duplicates: bool = True
+    ) -> List[Tuple[float, IndexedChunk]]:
+        """
+        collapse_duplicates=True returns one hit per unique text (its locations are on
+        the chunk); False expands every hit into one result per source location.
+
+        Expanded results all share the score of the text that was embedded: a
+        near-duplicate location shows its own text, but that text was never scored.
+        """
         if self.nn is None or self.embeddings is None:
             raise RuntimeError("Index not built. Call build_from_docs() or load().")
 
         q_emb = self.model.encode([query], normalize_embeddings=True)
+        return self.search_embedding(q_emb, top_k=top_k, collapse_duplicates=collapse_duplicates)
+
+    def search_embedding(
+        self, q_emb: np.ndarray, top_k: int = 5, collapse_duplicates: bool = True
+    ) -> List[Tuple[float, IndexedChunk]]:
+        """
+        Same as search(), but takes an already encoded (normalized) query of shape (1, dim).
+        """
+        if self.nn is None or self.embeddings is None:
+            raise RuntimeError("Index not built. Call build_from_docs() or load().")
+
+        q_emb = np.asarray(q_emb, dtype=np.float32).reshape(1, -1)
         distances, idxs = self.nn.kneighbors(q_emb, n_neighbors=min(top_k, len(self.chunks)))
         distances = distances[0]
         idxs = idxs[0]
@@ -65,6 +242,10 @@ class SemanticCorpusIndex:
             # cosine similarity = 1 - cosine distance
             score = float(1.0 - dist)
             results.append((score, self.chunks[int(i)]))
+
+        if not collapse_duplicates:
+            # every location keeps the representative's score (see search())
+            results = [(score, c) for score, chunk in results for c in chunk.expand()][:top_k]
         return results
 
     def save(self, path: str) -> None:
@@ -77,6 +258,7 @@ class SemanticCorpusIndex:
                 {
                     "chunks": self.chunks,
                     "embeddings": self.embeddings,
+                    "dedup_stats": self.dedup_stats,
                 },
                 f,
             )
@@ -87,6 +269,7 @@ class SemanticCorpusIndex:
 
         self.chunks = data["chunks"]
         self.embeddings = data["embeddings"]
+        self.dedup_stats = data.get("dedup_stats", {})
 
         self.nn = NearestNeighbors(metric="cosine", algorithm="auto")
         self.nn.fit(self.embeddings)
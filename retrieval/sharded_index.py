@@ -0,0 +1,373 @@
+import hashlib
+import heapq
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from nlp.deduplication import deduplicate_paragraphs
+from nlp.segmentation import Paragraph
+from retrieval.semantic_search import EmptyCorpusError, IndexedChunk, SemanticCorpusIndex
+
+MANIFEST_NAME = "manifest.json"
+
+# Per-process state of a shard worker. Every shard is pinned to one worker
+# (see ShardedCorpusIndex._executor_for), so a worker only ever caches its own shards.
+_SHARD_CACHE: Dict[str, Tuple[float, SemanticCorpusIndex]] = {}   # path -> (mtime, index)
+_ENCODERS: Dict[str, SentenceTransformer] = {}                   # model_name -> model
+
+
+def shard_for_doc(doc_id: str, num_shards: int) -> int:
+    """
+    Stable shard assignment: md5 of the doc_id modulo the number of shards.
+    (Python's hash() is salted per process, so it can't be used here.)
+    """
+    digest = hashlib.md5(doc_id.encode("utf-8")).hexdigest()
+    return int(digest, 16) % num_shards
+
+
+def _worker_init(threads: int) -> None:
+    # limit torch threads so workers don't fight over cores
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _worker_encoder(model_name: str) -> SentenceTransformer:
+    # one encoder per process, shared by every shard that process builds;
+    # loaded on first build so search-only workers never pay for it
+    if model_name not in _ENCODERS:
+        _ENCODERS[model_name] = SentenceTransformer(model_name)
+    return _ENCODERS[model_name]
+
+
+def _build_shard(
+    docs,
+    shard_path: str,
+    model_name: str,
+    min_par_len: int,
+    dedup: bool,
+    near_dup_threshold: Optional[float],
+) -> Tuple[int, int]:
+    """
+    Builds and saves one shard.
+    Returns (indexed chunks, encodes saved by dedup); (0, 0) for an empty shard.
+    """
+    index = SemanticCorpusIndex(model_name, model=_worker_encoder(model_name))
+    try:
+        index.build_from_docs(
+            docs, min_par_len=min_par_len, dedup=dedup, near_dup_threshold=near_dup_threshold
+        )
+    except EmptyCorpusError:
+        # no paragraphs landed in this shard; any other error reaches the caller
+        if os.path.exists(shard_path):
+            os.remove(shard_path)
+        return 0, 0
+    index.save(shard_path)
+    return len(index.chunks), index.dedup_stats.get("encodes_saved", 0)
+
+
+def _collapse_across_shards(
+    hits: List[Tuple[float, IndexedChunk]], near_dup_threshold: Optional[float]
+) -> List[Tuple[float, IndexedChunk]]:
+    """
+    Dedup only runs inside a shard, so the same boilerplate can come back once per shard.
+    Runs the same exact + MinHash dedup over the hits, best score first, and merges
+    each group into its best hit, keeping all locations.
+    """
+    hits = sorted(hits, key=lambda hit: hit[0], reverse=True)
+    items = [(str(i), Paragraph(i, chunk.text)) for i, (_, chunk) in enumerate(hits)]
+    groups = deduplicate_paragraphs(items, near_dup_threshold=near_dup_threshold).groups
+
+    out: List[Tuple[float, IndexedChunk]] = []
+    for g in groups:
+        first, *rest = [i for _, i in g.locations]
+        score, chunk = hits[first]
+        if rest:
+            chunk = chunk.merge([hits[i][1] for i in rest])
+        out.append((score, chunk))
+    return out
+
+
+def _search_shard(
+    shard_path: str, q_emb: np.ndarray, top_k: int, collapse_duplicates: bool
+) -> List[Tuple[float, IndexedChunk]]:
+    mtime = os.path.getmtime(shard_path)
+    cached = _SHARD_CACHE.get(shard_path)
+    if cached is None or cached[0] != mtime:
+        # first use in this process, or the shard was rebuilt since
+        index = SemanticCorpusIndex()
+        index.load(shard_path)
+        cached = (mtime, index)
+        _SHARD_CACHE[shard_path] = cached
+    hits = cached[1].search_embedding(q_emb, top_k=top_k, collapse_duplicates=collapse_duplicates)
+    # don't ship whole document buffers back to the parent
+    return [(score, chunk.detach()) for score, chunk in hits]
+
+
+class ShardedCorpusIndex:
+    """
+    A corpus index split into N shards by document hash.
+
+    Each shard is a regular SemanticCorpusIndex pickle inside `index_dir`, built and
+    saved independently. Shard i is always handled by worker i % workers, for builds
+    and searches alike, so each worker process only holds its own shards in memory.
+    Searches encode the query once, fan it out to the workers and merge the per-shard
+    top-k into a global top-k.
+    """
+
+    def __init__(
+        self,
+        index_dir: str,
+        num_shards: int = 4,
+        model_name: str = "all-MiniLM-L6-v2",
+        workers: Optional[int] = None,
+    ):
+        if num_shards < 1:
+            raise ValueError("num_shards must be >= 1")
+
+        self.index_dir = index_dir
+        self.num_shards = num_shards
+        self.model_name = model_name
+        self._requested_workers = workers
+        self.workers = min(workers or os.cpu_count() or 1, num_shards)
+        self.shard_sizes: List[int] = [0] * num_shards
+        self.encodes_saved: List[int] = [0] * num_shards
+
+        # index-wide build settings, set by build_from_docs() or read from the manifest
+        self.min_par_len = 50
+        self.dedup = True
+        self.near_dup_threshold: Optional[float] = 0.8
+        self._has_manifest = False
+
+        self._encoder = SemanticCorpusIndex(model_name)  # only used to encode queries
+        self._pools: List[ProcessPoolExecutor] = []
+
+    def shard_path(self, shard_id: int) -> str:
+        return os.path.join(self.index_dir, f"shard_{shard_id:03d}.pkl")
+
+    def partition(self, docs) -> List[list]:
+        """
+        docs: List[LoadedDoc]
+        Splits docs into num_shards lists, keeping every doc whole in one shard.
+        """
+        shards: List[list] = [[] for _ in range(self.num_shards)]
+        for d in docs:
+            shards[shard_for_doc(d.doc_id, self.num_shards)].append(d)
+        return shards
+
+    def _start_workers(self) -> None:
+        """
+        One single-process executor per worker. Uses "spawn": the parent may already
+        have torch/OpenMP threads running, and forking such a process can deadlock.
+        """
+        if self._pools:
+            return
+        ctx = multiprocessing.get_context("spawn")
+        threads = max(1, (os.cpu_count() or 1) // self.workers)
+        self._pools = [
+            ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=ctx,
+                initializer=_worker_init,
+                initargs=(threads,),
+            )
+            for _ in range(self.workers)
+        ]
+
+    def start_workers(self) -> None:
+        """
+        Starts the worker processes and waits until they are all up, so that process
+        start-up isn't counted in the first build or search (e.g. when benchmarking).
+        """
+        self._start_workers()
+        for pool in self._pools:
+            pool.submit(int).result()
+
+    def _executor_for(self, shard_id: int) -> ProcessPoolExecutor:
+        self._start_workers()
+        return self._pools[shard_id % self.workers]
+
+    def build_from_docs(
+        self,
+        docs,
+        min_par_len: int = 50,
+        dedup: bool = True,
+        near_dup_threshold: Optional[float] = 0.8,
+    ) -> None:
+        """
+        Builds all shards in parallel (one process per shard, up to `workers`).
+        """
+        self.min_par_len = min_par_len
+        self.dedup = dedup
+        self.near_dup_threshold = near_dup_threshold
+        os.makedirs(self.index_dir, exist_ok=True)
+        shards = self.partition(docs)
+
+        futures = [
+            self._executor_for(i).submit(
+                _build_shard, shard_docs, self.shard_path(i), self.model_name,
+                min_par_len, dedup, near_dup_threshold,
+            )
+            for i, shard_docs in enumerate(shards)
+        ]
+        built = [f.result() for f in futures]
+        self.shard_sizes = [n for n, _ in built]
+        self.encodes_saved = [saved for _, saved in built]
+
+        if not any(self.shard_sizes):
+            raise EmptyCorpusError("No paragraphs found to index (try lowering min_par_len).")
+
+        self._write_manifest()
+
+    def rebuild_shard(
+        self,
+        shard_id: int,
+        docs,
+        min_par_len: Optional[int] = None,
+        dedup: Optional[bool] = None,
+        near_dup_threshold: Optional[float] = None,
+    ) -> None:
+        """
+        Rebuilds a single shard. `docs` may be the whole corpus: only documents that
+        hash to `shard_id` are indexed, the other shards are left untouched.
+
+        The build settings default to the ones the index was built with; passing
+        different ones raises ValueError, since the shard would no longer match the
+        others (rebuild everything with build_from_docs() to change them).
+        Requires an existing index: the manifest is read if load() wasn't called.
+        """
+        if not self._has_manifest:
+            if not os.path.exists(os.path.join(self.index_dir, MANIFEST_NAME)):
+                raise RuntimeError("No index to rebuild a shard of. Call build_from_docs() first.")
+            # no missing-file check, since a lost shard file is exactly what we may be rebuilding
+            self._apply_manifest(self._read_manifest())
+
+        requested = {
+            "min_par_len": min_par_len,
+            "dedup": dedup,
+            "near_dup_threshold": near_dup_threshold,
+        }
+        for name, value in requested.items():
+            built_with = getattr(self, name)
+            # None means "whatever the index was built with"
+            if value is not None and value != built_with:
+                raise ValueError(
+                    f"Index was built with {name}={built_with!r}, not {value!r}; "
+                    "use build_from_docs() to change it for all shards"
+                )
+
+        if not 0 <= shard_id < self.num_shards:
+            raise ValueError(f"shard_id must be in [0, {self.num_shards})")
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        shard_docs = [d for d in docs if shard_for_doc(d.doc_id, self.num_shards) == shard_id]
+
+        # built by the shard's own worker, which also picks up the new file on its next search
+        future = self._executor_for(shard_id).submit(
+            _build_shard, shard_docs, self.shard_path(shard_id), self.model_name,
+            self.min_par_len, self.dedup, self.near_dup_threshold,
+        )
+        self.shard_sizes[shard_id], self.encodes_saved[shard_id] = future.result()
+        self._write_manifest()
+
+    def search(
+        self, query: str, top_k: int = 5, collapse_duplicates: bool = True
+    ) -> List[Tuple[float, IndexedChunk]]:
+        """
+        Same results as SemanticCorpusIndex.search() over the whole corpus, with one
+        difference: duplicates inside a shard are grouped against the whole shard at
+        build time, while duplicates across shards are only grouped among the returned
+        hits, with the same exact + MinHash check and threshold.
+        """
+        live = [i for i, n in enumerate(self.shard_sizes) if n > 0]
+        if not live:
+            raise RuntimeError("Index not built. Call build_from_docs() or load().")
+
+        q_emb = self._encoder.model.encode([query], normalize_embeddings=True)
+        q_emb = np.asarray(q_emb, dtype=np.float32)
+
+        futures = [
+            self._executor_for(i).submit(
+                _search_shard, self.shard_path(i), q_emb, top_k, collapse_duplicates
+            )
+            for i in live
+        ]
+
+        # each shard returns its own top-k sorted by score; the global top-k is among them
+        candidates = [hit for f in futures for hit in f.result()]
+        if collapse_duplicates and self.dedup:
+            # a text in the global unique top-k is always in its own shard's top-k
+            return _collapse_across_shards(candidates, self.near_dup_threshold)[:top_k]
+        return heapq.nlargest(top_k, candidates, key=lambda hit: hit[0])
+
+    def _write_manifest(self) -> None:
+        manifest = {
+            "num_shards": self.num_shards,
+            "model_name": self.model_name,
+            "min_par_len": self.min_par_len,
+            "shard_sizes": self.shard_sizes,
+            "encodes_saved": self.encodes_saved,
+            "dedup": self.dedup,
+            "near_dup_threshold": self.near_dup_threshold,
+        }
+        with open(os.path.join(self.index_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        self._has_manifest = True
+
+    def _read_manifest(self) -> dict:
+        with open(os.path.join(self.index_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        if manifest["model_name"] != self.model_name:
+            raise ValueError(
+                f"Index was built with {manifest['model_name']}, not {self.model_name}"
+            )
+        return manifest
+
+    def _apply_manifest(self, manifest: dict) -> None:
+        self.num_shards = manifest["num_shards"]
+        self.shard_sizes = manifest["shard_sizes"]
+        self.encodes_saved = manifest.get("encodes_saved", [0] * self.num_shards)
+        self.min_par_len = manifest.get("min_par_len", 50)
+        self.dedup = manifest.get("dedup", True)
+        self.near_dup_threshold = manifest.get("near_dup_threshold", 0.8)
+        self._has_manifest = True
+
+        # the shard count may differ from the one given to __init__
+        workers = min(self._requested_workers or os.cpu_count() or 1, self.num_shards)
+        if workers != self.workers:
+            self.close()
+            self.workers = workers
+
+    def load(self) -> None:
+        """
+        Reads the manifest from index_dir. Shards themselves are loaded lazily by the
+        worker processes on their first search.
+        """
+        self._apply_manifest(self._read_manifest())
+
+        missing = [
+            self.shard_path(i)
+            for i, n in enumerate(self.shard_sizes)
+            if n > 0 and not os.path.exists(self.shard_path(i))
+        ]
+        if missing:
+            raise FileNotFoundError(f"Missing shard files: {missing}")
+
+    def close(self) -> None:
+        for pool in self._pools:
+            pool.shutdown()
+        self._pools = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()